@@ -1,64 +1,97 @@
 #pylint : disable = missing-module-docstring
-import csv
 import os
 import random
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, timedelta
 from typing import Optional
 
+import pyarrow as pa
+import pyarrow.parquet as pq
 import requests
+from requests.adapters import HTTPAdapter
 
 # Configuration
 BASE_API_URL = "http://127.0.0.1:8000/"
 STORES = ["Lille", "Paris", "Lyon", "Toulouse", "Marseille"]
 OUTPUT_DIR = "data/raw"
 SENSORS = list(range(8))  # IDs 0 à 7
-
-
-def fetch_store_data(
-    store_name: str, query_date: date, sensor_id: Optional[int] = None
-) -> Optional[float]:
+MAX_WORKERS = 32
+WRITE_BATCH_SIZE = 65536
+
+# Schéma des fichiers bruts visiteurs_YYYY-MM.parquet
+RAW_SCHEMA = pa.schema(
+    [
+        ("date", pa.date32()),
+        ("heure", pa.string()),
+        ("id_du_capteur", pa.int64()),
+        ("id_du_magasin", pa.string()),
+        ("nombre_visiteurs", pa.float64()),
+        ("unite", pa.string()),
+    ]
+)
+
+# Session partagée : les connexions keep-alive sont réutilisées entre les appels
+session = requests.Session()
+adapter = HTTPAdapter(pool_connections=16, pool_maxsize=64)
+session.mount("http://", adapter)
+session.mount("https://", adapter)
+
+
+def fetch_store_range(
+    store_name: str, start_date: date, end_date: date, sensor_id: Optional[int] = None
+) -> Optional[list]:
     """
-    Récupère les données de visiteurs d'un magasin via l'API.
+    Récupère en une seule requête les visiteurs d'un magasin jour par jour.
 
     Args:
         store_name: Nom du magasin (ex: "Lille")
-        query_date: Date pour laquelle récupérer les données
+        start_date: Date de début (incluse)
+        end_date: Date de fin (incluse)
         sensor_id: ID du capteur (0-7). Si None, retourne le total du magasin
 
     Returns:
-        float: Nombre de visiteurs
+        list: Nombre de visiteurs pour chaque jour, -1 les dimanches,
+            None les jours sans donnée (magasin fermé selon l'API)
         None: En cas d'erreur
-        -1: Si le magasin est fermé (dimanche)
-
-    Raises:
-        Affiche les erreurs de requête mais ne les propage pas
     """
-    if query_date.weekday() == 6:  # Dimanche
-        return -1
-
     params = {
         "store_name": store_name,
-        "year": query_date.year,
-        "month": query_date.month,
-        "day": query_date.day,
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
     }
     if sensor_id is not None:
         params["sensor_id"] = sensor_id
 
     try:
-        response = requests.get(BASE_API_URL, params=params, timeout=5)
+        response = session.get(f"{BASE_API_URL}range", params=params, timeout=5)
         response.raise_for_status()
-        return float(response.json())
+        visits = [None if visit is None else float(visit) for visit in response.json()]
     except Exception as e:
-        print(f"Erreur pour {store_name} le {query_date}: {str(e)}")
+        print(f"Erreur pour {store_name} du {start_date} au {end_date}: {str(e)}")
         return None
 
+    # Le magasin est fermé le dimanche
+    day = start_date
+    for i in range(len(visits)):
+        if day.weekday() == 6:
+            visits[i] = -1
+        day += timedelta(days=1)
+    return visits
+
+
+def _flush_batch(writer: pq.ParquetWriter, batch: dict) -> None:
+    """Écrit les lignes accumulées (colonne par colonne) puis vide le lot"""
+    if batch["date"]:
+        writer.write_table(pa.Table.from_pydict(batch, schema=RAW_SCHEMA))
+    for values in batch.values():
+        values.clear()
+
 
 def generate_monthly_report(
     start_date: date, end_date: date, add_noise: bool = False, noise_rate: float = 0.1
 ) -> None:
     """
-    Génère des rapports mensuels au format CSV contenant les données de visiteurs.
+    Génère des rapports mensuels au format Parquet contenant les données de visiteurs.
 
     Args:
         start_date: Date de début (incluse)
@@ -70,7 +103,7 @@ def generate_monthly_report(
         None: Les fichiers sont écrits dans le dossier OUTPUT_DIR
 
     Notes:
-        - Format des fichiers: visiteurs_YYYY-MM.csv
+        - Format des fichiers: visiteurs_YYYY-MM.parquet (compression zstd)
         - Structure des données:
             date, heure, id_du_capteur, id_du_magasin, nombre_visiteurs, unite
         - Données corrompues possibles:
@@ -83,50 +116,48 @@ def generate_monthly_report(
     current_month = start_date.replace(day=1)
     while current_month <= end_date:
         month_str = current_month.strftime("%Y-%m")
-        filename = os.path.join(OUTPUT_DIR, f"visiteurs_{month_str}.csv")
-
-        with open(filename, "w", newline="", encoding="utf-8") as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(
-                [
-                    "date",
-                    "heure",
-                    "id_du_capteur",
-                    "id_du_magasin",
-                    "nombre_visiteurs",
-                    "unite",
-                ]
-            )
+        filename = os.path.join(OUTPUT_DIR, f"visiteurs_{month_str}.parquet")
 
+        with pq.ParquetWriter(filename, RAW_SCHEMA, compression="zstd") as writer:
+            days = []
             day = current_month.replace(day=1)
             while day.month == current_month.month and day <= end_date:
+                days.append(day)
+                day += timedelta(days=1)
+
+            # Un appel API par capteur pour tout le mois, exécutés en parallèle
+            tasks = [(store, sensor) for store in STORES for sensor in SENSORS]
+            with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+                monthly_visits = executor.map(
+                    lambda task: fetch_store_range(task[0], days[0], days[-1], task[1]), tasks
+                )
+                results = dict(zip(tasks, monthly_visits))
+
+            batch = {name: [] for name in RAW_SCHEMA.names}
+            for i, day in enumerate(days):
                 for store in STORES:
                     for sensor in SENSORS:
-                        visitors = fetch_store_data(store, day, sensor)
-                        if visitors is not None:
-                            writer.writerow(
-                                [
-                                    day.strftime("%Y-%m-%d"),
-                                    "12:00:00",
-                                    sensor,
-                                    store,
-                                    visitors,
-                                    "visiteurs",
-                                ]
-                            )
+                        visitors = results[(store, sensor)]
+                        if visitors is not None and visitors[i] is not None:
+                            batch["date"].append(day)
+                            batch["heure"].append("12:00:00")
+                            batch["id_du_capteur"].append(sensor)
+                            batch["id_du_magasin"].append(store)
+                            batch["nombre_visiteurs"].append(visitors[i])
+                            batch["unite"].append("visiteurs")
 
                     if add_noise and random.random() < noise_rate:
-                        writer.writerow(
-                            [
-                                day.strftime("%Y-%m-%d"),
-                                "12:00:00",
-                                None if random.random() < 0.5 else 999,
-                                store,
-                                -1 if random.random() < 0.5 else 999999,
-                                random.choice(["litres", "kg", "foo"]),
-                            ]
-                        )
-                day += timedelta(days=1)
+                        batch["date"].append(day)
+                        batch["heure"].append("12:00:00")
+                        batch["id_du_capteur"].append(None if random.random() < 0.5 else 999)
+                        batch["id_du_magasin"].append(store)
+                        batch["nombre_visiteurs"].append(-1 if random.random() < 0.5 else 999999)
+                        batch["unite"].append(random.choice(["litres", "kg", "foo"]))
+
+                    if len(batch["date"]) >= WRITE_BATCH_SIZE:
+                        _flush_batch(writer, batch)
+
+            _flush_batch(writer, batch)
         print(f"Fichier généré : {filename}")
         current_month = (current_month.replace(day=28) + timedelta(days=4)).replace(
             day=1
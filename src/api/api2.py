@@ -1,8 +1,16 @@
+import asyncio
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+import orjson
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 import os
 from datetime import datetime, date
+from functools import lru_cache
 from typing import Optional, List
 import uvicorn
 
@@ -22,13 +30,93 @@ app.add_middleware(
 )
 
 # Chemin vers les données
-DATA_PATH = "/home/ubuntu/Data-pipeline/data/filtered/daily_traffic_anomalies.parquet"
+DATA_PATH = "/home/ubuntu/Data-pipeline/data/filtered/daily_traffic_anomalies"
 
-def load_data():
-    """Charge les données depuis le fichier Parquet"""
+# Dataset partitionné par magasin et capteur (répertoires Hive)
+PARTITIONING = ds.partitioning(
+    pa.schema([('id_du_magasin', pa.string()), ('id_du_capteur', pa.int64())]),
+    flavor='hive'
+)
+
+# Table Arrow gardée en mémoire tant que le fichier n'est pas modifié, avec les
+# valeurs scalaires précalculées pour /stores, /api/sensors et /api/health
+_cache = {"mtime": None, "table": None, "summary": None}
+
+def data_mtime() -> float:
+    """Date de dernière modification des données, utilisée comme clé de cache"""
     if not os.path.exists(DATA_PATH):
         raise HTTPException(status_code=404, detail="Fichier de données non trouvé")
-    return pd.read_parquet(DATA_PATH)
+    # Maximum sur tous les répertoires et fichiers du dataset : réécrire une partition
+    # ne modifie pas la date du répertoire racine. Une table lue pendant l'écriture de la
+    # pipeline est relue dès que le fichier suivant est écrit
+    latest_mtime = os.stat(DATA_PATH).st_mtime
+    for root, _, files in os.walk(DATA_PATH):
+        latest_mtime = max(latest_mtime, os.stat(root).st_mtime)
+        for file in files:
+            latest_mtime = max(latest_mtime, os.stat(os.path.join(root, file)).st_mtime)
+    return latest_mtime
+
+def load_data() -> pa.Table:
+    """Charge les données depuis le fichier Parquet (relu seulement s'il a changé)"""
+    mtime = data_mtime()
+    if mtime != _cache["mtime"]:
+        # Tri une seule fois au chargement : les réponses restent ordonnées par magasin, date et capteur
+        table = pq.read_table(DATA_PATH, partitioning=PARTITIONING).sort_by(
+            [('id_du_magasin', 'ascending'), ('date', 'ascending'), ('id_du_capteur', 'ascending')]
+        )
+        ids = table.select(['id_du_magasin', 'id_du_capteur']).to_pandas()
+        sensors = ids.groupby('id_du_magasin', observed=True, sort=False)['id_du_capteur'].unique()
+        # Nouveau dictionnaire remplacé en une seule affectation (jamais modifié ensuite) :
+        # une réponse ne mélange pas deux versions des données
+        summary = {
+            "stores": ids['id_du_magasin'].unique().tolist(),
+            "sensors_by_store": {store: values.tolist() for store, values in sensors.items()},
+            "total_records": table.num_rows
+        }
+        _cache["table"] = table
+        _cache["summary"] = summary
+        _cache["mtime"] = mtime
+        # Les résultats calculés sur l'ancienne version des données ne servent plus
+        read_anomalies.cache_clear()
+        compute_sensor_metrics.cache_clear()
+    return _cache["table"]
+
+def load_summary() -> dict:
+    """Magasins, capteurs par magasin et nombre de lignes, calculés au chargement des données"""
+    load_data()
+    return _cache["summary"]
+
+def query_data(
+    columns: Optional[List[str]] = None,
+    store_id: Optional[str] = None,
+    sensor_id: Optional[int] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    threshold: Optional[float] = None
+) -> pd.DataFrame:
+    """Filtre les lignes et sélectionne les colonnes côté Arrow, avant la conversion en DataFrame"""
+    table = load_data()
+
+    conditions = []
+    if store_id is not None:
+        conditions.append(pc.field('id_du_magasin') == store_id)
+    if sensor_id is not None:
+        conditions.append(pc.field('id_du_capteur') == sensor_id)
+    if start_date:
+        conditions.append(pc.field('date') >= pd.to_datetime(start_date))
+    if end_date:
+        conditions.append(pc.field('date') <= pd.to_datetime(end_date))
+    if threshold is not None:
+        conditions.append(pc.abs(pc.field('pct_change')) > threshold)
+
+    if conditions:
+        expression = conditions[0]
+        for condition in conditions[1:]:
+            expression = expression & condition
+        table = table.filter(expression)
+    if columns is not None:
+        table = table.select(columns)
+    return table.to_pandas()
 
 @app.get("/")
 async def root():
@@ -45,12 +133,106 @@ async def root():
         ]
     }
 
+def orjson_response(content: dict) -> Response:
+    """Sérialise directement la réponse avec orjson (les NaN deviennent null),
+    sans passer par jsonable_encoder"""
+    return Response(
+        content=orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY),
+        media_type="application/json"
+    )
+
+def read_store_traffic(
+    store_id: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None
+) -> list:
+    """Lignes de trafic d'un magasin, prêtes pour la réponse JSON"""
+    # Filtrage par magasin et par dates si spécifiées
+    store_data = query_data(store_id=store_id, start_date=start_date, end_date=end_date)
+    
+    if store_data.empty and query_data(columns=['id_du_magasin'], store_id=store_id).empty:
+        raise HTTPException(status_code=404, detail=f"Magasin {store_id} non trouvé")
+    
+    # Conversion des dates en string (vectorisée) puis en format JSON
+    store_data = store_data.assign(date=store_data['date'].dt.strftime('%Y-%m-%d'))
+    return store_data.to_dict('records')
+
+# Les résultats dérivés ne dépendent que des paramètres et de la version des données (mtime) :
+# les requêtes répétées (tableaux de bord) sont servies depuis le cache. Une liste
+# d'anomalies peut contenir presque tout le dataset : peu d'entrées sont gardées
+
+@lru_cache(maxsize=16)
+def read_anomalies(
+    mtime: float,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    store_id: Optional[str] = None,
+    threshold: Optional[float] = 50.0
+) -> list:
+    """Lignes en anomalie, prêtes pour la réponse JSON"""
+    # Filtrage des anomalies, par magasin et par dates si spécifiés
+    anomalies = query_data(
+        store_id=store_id or None,
+        start_date=start_date,
+        end_date=end_date,
+        threshold=threshold
+    )
+    
+    # Conversion des dates en string (vectorisée) puis en format JSON
+    anomalies = anomalies.assign(date=anomalies['date'].dt.strftime('%Y-%m-%d'))
+    return anomalies.to_dict('records')
+
+@lru_cache(maxsize=512)
+def compute_sensor_metrics(mtime: float, store_id: str, sensor_id: int) -> dict:
+    """Calcule les métriques d'un capteur"""
+    # Filtrage par magasin et capteur
+    sensor_data = query_data(
+        columns=['date', 'trafic_journalier', 'pct_change', 'jour_semaine'],
+        store_id=store_id,
+        sensor_id=sensor_id
+    )
+    
+    if sensor_data.empty:
+        raise HTTPException(
+            status_code=404, 
+            detail=f"Capteur {sensor_id} non trouvé pour le magasin {store_id}"
+        )
+    
+    # Masque des anomalies calculé une seule fois
+    anomaly_count = int((sensor_data['pct_change'].abs() > 50).sum())
+    
+    # Calcul des métriques
+    return {
+        "store_id": store_id,
+        "sensor_id": sensor_id,
+        "data_points": len(sensor_data),
+        "date_range": {
+            "start": sensor_data['date'].min().strftime('%Y-%m-%d'),
+            "end": sensor_data['date'].max().strftime('%Y-%m-%d')
+        },
+        "traffic_metrics": {
+            "mean": float(sensor_data['trafic_journalier'].mean()),
+            "median": float(sensor_data['trafic_journalier'].median()),
+            "min": int(sensor_data['trafic_journalier'].min()),
+            "max": int(sensor_data['trafic_journalier'].max()),
+            "std": float(sensor_data['trafic_journalier'].std())
+        },
+        "anomalies": {
+            "count": anomaly_count,
+            "percentage": float(anomaly_count / len(sensor_data) * 100)
+        },
+        "weekly_pattern": sensor_data.groupby('jour_semaine', observed=True)['trafic_journalier'].mean().to_dict()
+    }
+
+# Les lectures et calculs pandas sont bloquants : ils sont exécutés dans un thread
+# pour ne pas bloquer la boucle d'événements pendant les autres requêtes
+
 @app.get("/stores")
 async def get_stores():
     """Récupère la liste de tous les magasins"""
     try:
-        df = load_data()
-        stores = df['id_du_magasin'].unique().tolist()
+        summary = await asyncio.to_thread(load_summary)
+        stores = summary["stores"]
         return {
             "stores": stores,
             "count": len(stores)
@@ -66,32 +248,13 @@ async def get_store_traffic(
 ):
     """Récupère les données de trafic pour un magasin"""
     try:
-        df = load_data()
-        
-        # Filtrage par magasin
-        store_data = df[df['id_du_magasin'] == store_id]
-        
-        if store_data.empty:
-            raise HTTPException(status_code=404, detail=f"Magasin {store_id} non trouvé")
-        
-        # Filtrage par dates si spécifiées
-        if start_date:
-            store_data = store_data[store_data['date'] >= pd.to_datetime(start_date)]
-        if end_date:
-            store_data = store_data[store_data['date'] <= pd.to_datetime(end_date)]
-        
-        # Conversion en format JSON
-        result = store_data.to_dict('records')
+        result = await asyncio.to_thread(read_store_traffic, store_id, start_date, end_date)
         
-        # Conversion des dates en string pour JSON
-        for record in result:
-            record['date'] = record['date'].strftime('%Y-%m-%d')
-        
-        return {
+        return orjson_response({
             "store_id": store_id,
             "data_count": len(result),
             "data": result
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -99,14 +262,12 @@ async def get_store_traffic(
 async def get_store_sensors(store_id: str):
     """Récupère la liste des capteurs pour un magasin"""
     try:
-        df = load_data()
+        summary = await asyncio.to_thread(load_summary)
         
-        store_data = df[df['id_du_magasin'] == store_id]
-        
-        if store_data.empty:
+        if store_id not in summary["sensors_by_store"]:
             raise HTTPException(status_code=404, detail=f"Magasin {store_id} non trouvé")
         
-        sensors = store_data['id_du_capteur'].unique().tolist()
+        sensors = summary["sensors_by_store"][store_id]
         
         return {
             "store_id": store_id,
@@ -125,33 +286,15 @@ async def get_anomalies(
 ):
     """Récupère les anomalies détectées sur une période"""
     try:
-        df = load_data()
-        
-        # Filtrage des anomalies
-        anomalies = df[abs(df['pct_change']) > threshold]
-        
-        # Filtrage par magasin si spécifié
-        if store_id:
-            anomalies = anomalies[anomalies['id_du_magasin'] == store_id]
+        result = await asyncio.to_thread(
+            read_anomalies, data_mtime(), start_date, end_date, store_id, threshold
+        )
         
-        # Filtrage par dates si spécifiées
-        if start_date:
-            anomalies = anomalies[anomalies['date'] >= pd.to_datetime(start_date)]
-        if end_date:
-            anomalies = anomalies[anomalies['date'] <= pd.to_datetime(end_date)]
-        
-        # Conversion en format JSON
-        result = anomalies.to_dict('records')
-        
-        # Conversion des dates en string pour JSON
-        for record in result:
-            record['date'] = record['date'].strftime('%Y-%m-%d')
-        
-        return {
+        return orjson_response({
             "anomalies_count": len(result),
             "threshold": threshold,
             "anomalies": result
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -159,44 +302,7 @@ async def get_anomalies(
 async def get_sensor_metrics(store_id: str, sensor_id: int):
     """Métriques détaillées pour un capteur spécifique"""
     try:
-        df = load_data()
-        
-        # Filtrage par magasin et capteur
-        sensor_data = df[
-            (df['id_du_magasin'] == store_id) & 
-            (df['id_du_capteur'] == sensor_id)
-        ]
-        
-        if sensor_data.empty:
-            raise HTTPException(
-                status_code=404, 
-                detail=f"Capteur {sensor_id} non trouvé pour le magasin {store_id}"
-            )
-        
-        # Calcul des métriques
-        metrics = {
-            "store_id": store_id,
-            "sensor_id": sensor_id,
-            "data_points": len(sensor_data),
-            "date_range": {
-                "start": sensor_data['date'].min().strftime('%Y-%m-%d'),
-                "end": sensor_data['date'].max().strftime('%Y-%m-%d')
-            },
-            "traffic_metrics": {
-                "mean": float(sensor_data['trafic_journalier'].mean()),
-                "median": float(sensor_data['trafic_journalier'].median()),
-                "min": int(sensor_data['trafic_journalier'].min()),
-                "max": int(sensor_data['trafic_journalier'].max()),
-                "std": float(sensor_data['trafic_journalier'].std())
-            },
-            "anomalies": {
-                "count": len(sensor_data[abs(sensor_data['pct_change']) > 50]),
-                "percentage": float(len(sensor_data[abs(sensor_data['pct_change']) > 50]) / len(sensor_data) * 100)
-            },
-            "weekly_pattern": sensor_data.groupby('jour_semaine')['trafic_journalier'].mean().to_dict()
-        }
-        
-        return metrics
+        return await asyncio.to_thread(compute_sensor_metrics, data_mtime(), store_id, sensor_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -204,11 +310,11 @@ async def get_sensor_metrics(store_id: str, sensor_id: int):
 async def health_check():
     """Vérification de l'état de l'API"""
     try:
-        df = load_data()
+        summary = await asyncio.to_thread(load_summary)
         return {
             "status": "healthy",
             "data_available": True,
-            "total_records": len(df),
+            "total_records": summary["total_records"],
             "last_updated": datetime.now().isoformat()
         }
     except Exception as e:
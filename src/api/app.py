@@ -50,4 +50,41 @@ def visit(
             status_code=404, content="The store was closed try another date"
         )
 
-    return JSONResponse(status_code=200, content=visit_counts)
\ No newline at end of file
+    return JSONResponse(status_code=200, content=visit_counts)
+
+
+@app.get("/range")
+def visit_range(
+    store_name: str, start_date: date, end_date: date, sensor_id: int | None = None
+) -> JSONResponse:
+    # If the store is not in the dictionary
+    if not (store_name in store_dict.keys()):
+        return JSONResponse(status_code=404, content="Store Not found")
+
+    # Check the value of sensor_id
+    if sensor_id and (sensor_id > 7 or sensor_id < 0):
+        return JSONResponse(
+            status_code=404, content="Sensor_id should be between 0 and 7"
+        )
+
+    # Check the year
+    if start_date.year < 2019:
+        return JSONResponse(status_code=404, content="No data before 2019")
+
+    # Check the dates are ordered and in the past
+    if end_date < start_date:
+        return JSONResponse(status_code=404, content="end_date is before start_date")
+    if date.today() < end_date:
+        return JSONResponse(status_code=404, content="Choose a date in the past")
+
+    # One value per day. A negative count is answered "store closed" (404) by "/",
+    # here the day is null so both endpoints agree
+    if sensor_id is None:
+        visit_counts = store_dict[store_name].get_all_traffic_range(start_date, end_date)
+    else:
+        visit_counts = store_dict[store_name].get_sensor_traffic_range(
+            sensor_id, start_date, end_date
+        )
+    content = [visits if visits >= 0 else None for visits in visit_counts.tolist()]
+
+    return JSONResponse(status_code=200, content=content)
\ No newline at end of file
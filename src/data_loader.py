@@ -1,15 +1,40 @@
 # data_loader.py
 import os
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
+from typing import Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+def read_visitor_file(file: Path) -> Optional[pa.Table]:
+    """
+    Read one visitor Parquet file as an Arrow table.
+
+    Args:
+        file: Path to the Parquet file
+
+    Returns:
+        pa.Table: The file content, or None if it could not be read
+    """
+    try:
+        table = pq.read_table(file)
+        print(f"Loaded data from {file.name}")
+        return table
+    except Exception as e:
+        print(f"Error loading {file.name}: {str(e)}")
+        return None
 
 
 def load_visitor_data(raw_data_path: str = "data/raw") -> pd.DataFrame:
     """
-    Load all visitor CSV files from the raw data directory and combine them into a single DataFrame.
+    Load all visitor Parquet files from the raw data directory and combine them into a single DataFrame.
 
     Args:
-        raw_data_path: Path to the directory containing the raw CSV files
+        raw_data_path: Path to the directory containing the raw Parquet files
 
     Returns:
         pd.DataFrame: Combined visitor data from all months
@@ -21,26 +46,40 @@ def load_visitor_data(raw_data_path: str = "data/raw") -> pd.DataFrame:
     if not raw_dir.exists():
         raise FileNotFoundError(f"Raw data directory not found: {raw_dir}")
 
-    # Find all CSV files in the directory
-    csv_files = list(raw_dir.glob("visiteurs_*.csv"))
+    # Find all Parquet files in the directory
+    parquet_files = list(raw_dir.glob("visiteurs_*.parquet"))
+
+    if not parquet_files:
+        raise FileNotFoundError(f"No visitor Parquet files found in {raw_dir}")
 
-    if not csv_files:
-        raise FileNotFoundError(f"No visitor CSV files found in {raw_dir}")
+    # The parsed data is reused as long as no file was added, removed or rewritten
+    latest_mtime = max(file.stat().st_mtime for file in parquet_files)
+    combined_df = read_visitor_files(tuple(sorted(parquet_files)), latest_mtime)
 
-    # Read and concatenate all CSV files
-    dfs = []
-    for file in csv_files:
-        try:
-            df = pd.read_csv(file)
-            dfs.append(df)
-            print(f"Loaded data from {file.name}")
-        except Exception as e:
-            print(f"Error loading {file.name}: {str(e)}")
+    # Callers modify the returned DataFrame, the cached one must stay untouched
+    return combined_df.copy()
+
+
+@lru_cache(maxsize=4)
+def read_visitor_files(parquet_files: Tuple[Path, ...], latest_mtime: float) -> pd.DataFrame:
+    """
+    Read and combine the visitor Parquet files, cached on the file list and their latest mtime.
+
+    Args:
+        parquet_files: Paths to the Parquet files
+        latest_mtime: Most recent modification time among the files, used as cache key
+
+    Returns:
+        pd.DataFrame: Combined visitor data sorted by date, sensor and store
+    """
+    # Read all Parquet files in parallel, then concatenate the Arrow tables
+    with ThreadPoolExecutor() as executor:
+        tables = [table for table in executor.map(read_visitor_file, parquet_files) if table is not None]
 
-    if not dfs:
-        raise ValueError("No valid data could be loaded from the CSV files")
+    if not tables:
+        raise ValueError("No valid data could be loaded from the Parquet files")
 
-    combined_df = pd.concat(dfs, ignore_index=True)
+    combined_df = pa.concat_tables(tables).to_pandas(date_as_object=False)
 
     # Convert date column to datetime
     combined_df['date'] = pd.to_datetime(combined_df['date'])
@@ -1,12 +1,19 @@
 import os
+import shutil
 import pandas as pd
-from pathlib import Path
-from typing import List
-import plotly.express as px
-import plotly.graph_objects as go
+import pyarrow as pa
+import pyarrow.dataset as ds
 import numpy as np
 
-raw_data_path = "./data/raw"
+from src.data_loader import load_visitor_data
+
+RAW_DATA_PATH = "./data/raw"
+OUTPUT_PATH = "./data/filtered/daily_traffic_anomalies"
+ARROW_OUTPUT_PATH = "./data/filtered/daily_traffic_anomalies_arrow"
+WEEKLY_OUTPUT_PATH = "./data/filtered/weekly_traffic.parquet"
+MONTHLY_OUTPUT_PATH = "./data/filtered/monthly_traffic.parquet"
+STORES_SENSORS_OUTPUT_PATH = "./data/filtered/stores_sensors.parquet"
+JOURS_SEMAINE = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
 
 
 def validate_sensor_ids(df: pd.DataFrame) -> pd.DataFrame:
@@ -26,99 +33,201 @@ def validate_sensor_ids(df: pd.DataFrame) -> pd.DataFrame:
 
     return df[valid_ids].copy()
 
-def get_visitor_csv_files(raw_data_path: str) -> List[Path]:
-    raw_dir = Path(raw_data_path)
-    if not raw_dir.is_dir():
-        raise FileNotFoundError(f"Directory not found: {raw_dir}")
-    csv_files = list(raw_dir.glob("visiteurs_*.csv"))
-    if not csv_files:
-        raise FileNotFoundError(f"No CSV files matching pattern 'visiteurs_*.csv' found in {raw_dir}")
-    return csv_files
-
-
-def load_and_merge_data(raw_data_path: str) -> pd.DataFrame:
-    csv_files = get_visitor_csv_files(raw_data_path)
-    dfs = []
-    for file in csv_files:
-        try:
-            df = pd.read_csv(file)
-            # Convertir et valider les IDs de capteur dès le chargement
-            df["id_du_capteur"] = pd.to_numeric(df["id_du_capteur"], errors='coerce')
-            dfs.append(df)
-        except Exception as e:
-            print(f"Error loading {file.name}: {str(e)}")
-
-    combined_df = pd.concat(dfs, ignore_index=True)
-    combined_df["date"] = pd.to_datetime(combined_df["date"])
-
-    # Valider les IDs avant le tri
-    combined_df = validate_sensor_ids(combined_df)
-    combined_df.sort_values(["date", "id_du_capteur", "id_du_magasin"], inplace=True)
-
-    return combined_df
-
-# Step 1: Lecture et Fusion des Données CSV
-try:
-    df_combined = load_and_merge_data(raw_data_path)
-    print(f"Nombre de lignes: {df_combined.shape[0]}")
-    print(f"Nombre de colonnes: {df_combined.shape[1]}")
-    print("Premières lignes du DataFrame fusionné:")
-    print(df_combined.head())
-except Exception as e:
-    print(f"Erreur lors de l'ingestion des données: {e}")
-
 # Step 2: Agrégation Journalisée
-df_combined["heure"] = pd.to_datetime(df_combined["heure"]).dt.time
-df_combined["id_du_capteur"] = df_combined["id_du_capteur"].astype(int) # Handle missing sensor IDs
-df_combined["nombre_visiteurs"] = pd.to_numeric(df_combined["nombre_visiteurs"], errors='coerce').fillna(0) # Handle non-numeric and NaN values
-df_combined["nombre_visiteurs"] = df_combined["nombre_visiteurs"].apply(lambda x: max(0, x)) # Ensure no negative visitors
-
-df_daily_traffic = df_combined.groupby(["date", "id_du_magasin", "id_du_capteur"])["nombre_visiteurs"].sum().reset_index()
-df_daily_traffic.rename(columns={"nombre_visiteurs": "trafic_journalier"}, inplace=True)
-
-df_daily_traffic["jour_semaine"] = df_daily_traffic["date"].dt.day_name()
-df_daily_traffic["mois"] = df_daily_traffic["date"].dt.month_name()
-df_daily_traffic["annee"] = df_daily_traffic["date"].dt.year
+def clean_visitor_data(df: pd.DataFrame) -> pd.DataFrame:
+    # "heure" n'est pas utilisée par l'agrégation journalière : elle reste une chaîne
+    df["id_du_capteur"] = df["id_du_capteur"].astype(int) # Handle missing sensor IDs
+    df["nombre_visiteurs"] = pd.to_numeric(df["nombre_visiteurs"], errors='coerce').fillna(0) # Handle non-numeric and NaN values
+    df["nombre_visiteurs"] = df["nombre_visiteurs"].clip(lower=0) # Ensure no negative visitors
+    return df
 
-print("\nAgrégation Journalisée (premières lignes):")
-print(df_daily_traffic.head())
+def aggregate_daily_traffic(df: pd.DataFrame) -> pd.DataFrame:
+    group_cols = ["date", "id_du_magasin", "id_du_capteur"]
+    # Agrégation par hachage multi-threadée du moteur de calcul Arrow
+    table = pa.Table.from_pandas(df[group_cols + ["nombre_visiteurs"]], preserve_index=False)
+    daily = (
+        table.group_by(group_cols)
+        .aggregate([("nombre_visiteurs", "sum")])
+        .sort_by([(col, "ascending") for col in group_cols])
+        .to_pandas()
+    )
+    daily.rename(columns={"nombre_visiteurs_sum": "trafic_journalier"}, inplace=True)
+    daily = daily[group_cols + ["trafic_journalier"]]
+
+    # Colonnes texte encodées en catégories (codes entiers) : groupby plus rapides,
+    # moins de mémoire et colonnes dictionnaire dans le Parquet
+    daily["id_du_magasin"] = daily["id_du_magasin"].astype("category")
+    daily["jour_semaine"] = pd.Categorical(
+        daily["date"].dt.day_name(), categories=JOURS_SEMAINE, ordered=True
+    )
+    daily["mois"] = daily["date"].dt.month_name().astype("category")
+    daily["annee"] = daily["date"].dt.year
+    return daily
 
 # Step 3: Calcul de la Moyenne Mobile sur 4 Semaines
 def calculate_rolling_average(df: pd.DataFrame) -> pd.DataFrame:
-    df_sorted = df.sort_values(by="date")
-    df_sorted["moyenne_mobile_4_semaines"] = df_sorted.groupby(["id_du_magasin", "id_du_capteur", "jour_semaine"])["trafic_journalier"].transform(
-        lambda x: x.rolling(window=4, min_periods=1).mean()
+    group_cols = ["id_du_magasin", "id_du_capteur", "jour_semaine"]
+    df_sorted = df.sort_values(by=group_cols + ["date"])
+    # Fenêtre glissante calculée par groupe en Cython (sans lambda Python par groupe)
+    df_sorted["moyenne_mobile_4_semaines"] = (
+        df_sorted.groupby(group_cols, sort=False, observed=True)["trafic_journalier"]
+        .rolling(window=4, min_periods=1)
+        .mean()
+        .reset_index(level=[0, 1, 2], drop=True)
     )
     return df_sorted
 
-df_daily_traffic = calculate_rolling_average(df_daily_traffic)
-print("\nMoyenne Mobile sur 4 Semaines (premières lignes):")
-print(df_daily_traffic.head())
-
 # Step 4: Détection d’Anomalies par Écart Relatif
 def detect_anomalies(df: pd.DataFrame) -> pd.DataFrame:
-    df["pct_change"] = np.where(
-        df["moyenne_mobile_4_semaines"] == 0,
-        np.nan, # Avoid division by zero, set to NaN
-        ((df["trafic_journalier"] - df["moyenne_mobile_4_semaines"]) / df["moyenne_mobile_4_semaines"]) * 100
-    )
+    traffic = df["trafic_journalier"].to_numpy(dtype=np.float64)
+    average = df["moyenne_mobile_4_semaines"].to_numpy(dtype=np.float64)
+    # Division uniquement là où la moyenne est non nulle, dans un seul tampon de sortie
+    # (NaN ailleurs pour éviter la division par zéro)
+    pct_change = np.full_like(traffic, np.nan)
+    np.divide(traffic - average, average, out=pct_change, where=average != 0)
+    pct_change *= 100
     # Cap the percentage change to a reasonable range for display/analysis
-    df["pct_change"] = df["pct_change"].clip(lower=-100, upper=200) # Example range, adjust as needed
+    np.clip(pct_change, -100, 200, out=pct_change) # Example range, adjust as needed
+    df["pct_change"] = pct_change
     return df
 
-df_daily_traffic = detect_anomalies(df_daily_traffic)
-print("\nDétection d'Anomalies (premières lignes avec pct_change):")
-print(df_daily_traffic.head())
-
 # Step 5: Exportation au Format Parquet
-output_dir = "./data/filtered"
-os.makedirs(output_dir, exist_ok=True)
-output_file = os.path.join(output_dir, "daily_traffic_anomalies.parquet")
-df_daily_traffic.to_parquet(output_file, index=False)
-print(f"Données filtrées et nettoyées exportées vers: {output_file}")
-print("\nAvantages du format Parquet par rapport à CSV:")
-print("- **Compression**: Parquet utilise des schémas de compression avancés, réduisant considérablement la taille des fichiers.")
-print("- **Performance**: C'est un format de stockage colonnaire, ce qui signifie que les requêtes qui ne nécessitent que certaines colonnes sont beaucoup plus rapides car elles ne lisent pas les données non pertinentes.")
-print("- **Schéma évolutif**: Parquet prend en charge l'évolution du schéma, ce qui est utile dans les pipelines de données où les schémas peuvent changer au fil du temps.")
-print("- **Interopérabilité**: Largement utilisé dans l'écosystème Big Data (Spark, Hive, Impala, etc.).")
+def export_daily_traffic(df: pd.DataFrame, output_path: str) -> None:
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    # Le dataset est entièrement réécrit à chaque exécution
+    shutil.rmtree(output_path, ignore_errors=True)
+    # Un fichier par couple magasin/capteur (répertoires Hive) : un filtre sur ces colonnes
+    # ne lit que les fichiers concernés. Tri par date dans chaque fichier pour des
+    # statistiques min/max serrées
+    df.sort_values(["id_du_magasin", "id_du_capteur", "date"], inplace=True)
+    df.to_parquet(
+        output_path,
+        engine="pyarrow",
+        partition_cols=["id_du_magasin", "id_du_capteur"],
+        basename_template="part-{i}.parquet",
+        row_group_size=50000,
+        compression="zstd",
+        index=False
+    )
+
+def export_daily_traffic_ipc(df: pd.DataFrame, output_path: str) -> None:
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    shutil.rmtree(output_path, ignore_errors=True)
+    # Même dataset au format Arrow IPC non compressé et avec le même partitionnement :
+    # Streamlit le lit en mémoire mappée, sans décodage, pages partagées entre processus
+    table = pa.Table.from_pandas(
+        df.sort_values(["id_du_magasin", "id_du_capteur", "date"]), preserve_index=False
+    )
+    ds.write_dataset(
+        table,
+        output_path,
+        format="ipc",
+        partitioning=["id_du_magasin", "id_du_capteur"],
+        partitioning_flavor="hive",
+        basename_template="part-{i}.arrow"
+    )
+
+# Step 6: Agrégats Hebdomadaires et Mensuels
+def aggregate_periods(df: pd.DataFrame, freq: str) -> pd.DataFrame:
+    """Agrège le trafic journalier par semaine ("W") ou par mois ("M"), pour chaque magasin et capteur"""
+    # Pas de copie triée du DataFrame : les clés de groupe sont triées par le groupby et
+    # la première date d'une période est sa date minimale
+    dates = df["date"].to_numpy()
+    # Numéro de période en arithmétique entière sur les dates, sans objet Period par ligne
+    if freq == "W":
+        # Semaines du lundi au dimanche (le 1er janvier 1970 était un jeudi)
+        periode = (dates.astype("datetime64[D]").astype(np.int64) + 3) // 7
+    else:
+        periode = dates.astype("datetime64[M]").astype(np.int64)
+    periods = (
+        df.groupby(
+            ["id_du_magasin", "id_du_capteur", pd.Series(periode, index=df.index, name="periode")],
+            observed=True,
+        )
+        .agg(
+            trafic_journalier=("trafic_journalier", "sum"),
+            moyenne_mobile_4_semaines=("moyenne_mobile_4_semaines", "mean"),
+            date=("date", "min"),
+        )
+        .reset_index()
+    )
+    # Libellés ("2025-01-06/2025-01-12", "2025-01") calculés sur les lignes agrégées seulement
+    if freq == "W":
+        start = (periods["periode"].to_numpy() * 7 - 3).astype("datetime64[D]")
+        periods["periode"] = np.char.add(np.char.add(start.astype(str), "/"), (start + 6).astype(str))
+    else:
+        periods["periode"] = periods["periode"].to_numpy().astype("datetime64[M]").astype(str)
+    return periods
+
+def export_period_traffic(df: pd.DataFrame, output_path: str) -> None:
+    # Petits fichiers lus tels quels par l'application Streamlit
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    df.to_parquet(output_path, engine="pyarrow", compression="zstd", index=False)
+
+def export_stores_sensors(df: pd.DataFrame, output_path: str) -> None:
+    # Couples (magasin, capteur) distincts : les listes de sélection de Streamlit
+    # sont lues dans ce petit fichier, sans parcourir les données
+    pairs = (
+        df[["id_du_magasin", "id_du_capteur"]]
+        .drop_duplicates()
+        .sort_values(["id_du_magasin", "id_du_capteur"])
+    )
+    export_period_traffic(pairs, output_path)
+
+def run_pipeline(
+    raw_data_path: str = RAW_DATA_PATH,
+    output_path: str = OUTPUT_PATH,
+    arrow_output_path: str = ARROW_OUTPUT_PATH,
+    weekly_output_path: str = WEEKLY_OUTPUT_PATH,
+    monthly_output_path: str = MONTHLY_OUTPUT_PATH,
+    stores_sensors_output_path: str = STORES_SENSORS_OUTPUT_PATH
+) -> pd.DataFrame:
+    """Exécute la pipeline complète, des fichiers bruts au dataset Parquet filtré"""
+    # Step 1: Lecture et Fusion des Données Parquet
+    # Valider les IDs de capteur dès le chargement
+    df_combined = validate_sensor_ids(load_visitor_data(raw_data_path))
+    print(f"Nombre de lignes: {df_combined.shape[0]}")
+    print(f"Nombre de colonnes: {df_combined.shape[1]}")
+    print("Premières lignes du DataFrame fusionné:")
+    print(df_combined.head())
 
+    # Step 2: Agrégation Journalisée
+    df_daily_traffic = aggregate_daily_traffic(clean_visitor_data(df_combined))
+    print("\nAgrégation Journalisée (premières lignes):")
+    print(df_daily_traffic.head())
+
+    # Step 3: Calcul de la Moyenne Mobile sur 4 Semaines
+    df_daily_traffic = calculate_rolling_average(df_daily_traffic)
+    print("\nMoyenne Mobile sur 4 Semaines (premières lignes):")
+    print(df_daily_traffic.head())
+
+    # Step 4: Détection d’Anomalies par Écart Relatif
+    df_daily_traffic = detect_anomalies(df_daily_traffic)
+    print("\nDétection d'Anomalies (premières lignes avec pct_change):")
+    print(df_daily_traffic.head())
+
+    # Step 5: Exportation au Format Parquet
+    export_daily_traffic(df_daily_traffic, output_path)
+    print(f"Données filtrées et nettoyées exportées vers: {output_path}")
+    export_daily_traffic_ipc(df_daily_traffic, arrow_output_path)
+    print(f"Copie Arrow IPC pour Streamlit exportée vers: {arrow_output_path}")
+
+    # Step 6: Agrégats Hebdomadaires et Mensuels
+    export_period_traffic(aggregate_periods(df_daily_traffic, "W"), weekly_output_path)
+    export_period_traffic(aggregate_periods(df_daily_traffic, "M"), monthly_output_path)
+    print(f"Agrégats exportés vers: {weekly_output_path}, {monthly_output_path}")
+    export_stores_sensors(df_daily_traffic, stores_sensors_output_path)
+    print(f"Liste des magasins et capteurs exportée vers: {stores_sensors_output_path}")
+    return df_daily_traffic
+
+
+if __name__ == "__main__":
+    try:
+        run_pipeline()
+        print("\nAvantages du format Parquet par rapport à CSV:")
+        print("- **Compression**: Parquet utilise des schémas de compression avancés, réduisant considérablement la taille des fichiers.")
+        print("- **Performance**: C'est un format de stockage colonnaire, ce qui signifie que les requêtes qui ne nécessitent que certaines colonnes sont beaucoup plus rapides car elles ne lisent pas les données non pertinentes.")
+        print("- **Schéma évolutif**: Parquet prend en charge l'évolution du schéma, ce qui est utile dans les pipelines de données où les schémas peuvent changer au fil du temps.")
+        print("- **Interopérabilité**: Largement utilisé dans l'écosystème Big Data (Spark, Hive, Impala, etc.).")
+    except Exception as e:
+        print(f"Erreur lors de l'exécution de la pipeline: {e}")
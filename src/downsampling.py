@@ -0,0 +1,32 @@
+import numpy as np
+
+
+def lttb_indices(x, y, n_out):
+    """Indices des points conservés par l'algorithme LTTB (Largest-Triangle-Three-Buckets)"""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Le premier et le dernier point sont gardés, les autres sont répartis en n_out - 2 paquets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    edges = np.append(edges, n)
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Moyenne du paquet suivant (le dernier point pour le dernier paquet)
+        next_x = x[end:edges[i + 2]].mean()
+        next_y = y[end:edges[i + 2]].mean()
+        # Point formant le plus grand triangle avec le point retenu précédemment
+        area = np.abs((x[a] - next_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y - y[a]))
+        a = start + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+
+def downsample(df, column, n_out):
+    """Réduit la courbe `column` en fonction de la date à au plus n_out points"""
+    indices = lttb_indices(df["date"].to_numpy().astype(np.int64), df[column].to_numpy(), n_out)
+    return df.iloc[indices]
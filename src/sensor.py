@@ -3,6 +3,30 @@ from datetime import date, timedelta
 
 import numpy as np
 
+# Traffic multiplier per weekday, Monday = 0, Sunday = 6
+# More traffic on Wednesdays (2), Fridays (4) and Saturdays (5)
+WEEKDAY_FACTORS = np.array([1.0, 1.0, 1.10, 1.0, 1.25, 1.35, 1.0])
+
+
+# All the sensors share one random stream: each date owns DRAWS_PER_DAY
+# consecutive draws at a fixed position, so a date always gives the same
+# values whether it is simulated alone or as part of a range
+RANDOM_SEED = 0
+DRAWS_PER_DAY = 3
+
+
+def daily_draws(ordinals: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Return, for each date ordinal (consecutive days), the uniform draw used
+    for breakdowns and the standard normal draw used for the traffic"""
+    bit_generator = np.random.PCG64(RANDOM_SEED)
+    # Jump straight to the first date instead of re-seeding for every date
+    bit_generator.advance(DRAWS_PER_DAY * int(ordinals[0]))
+    uniforms = np.random.Generator(bit_generator).random((len(ordinals), DRAWS_PER_DAY))
+
+    # Box-Muller transform, 1 - u is in (0, 1] so the log is always defined
+    normals = np.sqrt(-2.0 * np.log1p(-uniforms[:, 1])) * np.cos(2.0 * np.pi * uniforms[:, 2])
+    return uniforms[:, 0], normals
+
 
 class VisitSensor:
     """
@@ -28,47 +52,49 @@ class VisitSensor:
     def simulate_visit_count(self, business_date: date) -> int:
         """Simulate the number of person detected by the sensor
         during the day"""
+        return self.simulate_range(business_date, business_date)[0]
 
-        # Ensure reproducibility of measurements
-        np.random.seed(seed=business_date.toordinal())
+    def simulate_range(self, start_date: date, end_date: date) -> np.ndarray:
+        """Simulate the number of person detected by the sensor
+        for each day between start_date and end_date (included)"""
+        ordinals = np.arange(start_date.toordinal(), end_date.toordinal() + 1)
+        _, normals = daily_draws(ordinals)
+        return self._simulate(ordinals, normals)
 
-        # Find out which day the business_date corresponds to: Monday = 0, Sunday = 6
-        week_day = business_date.weekday()
+    def _simulate(self, ordinals: np.ndarray, normals: np.ndarray) -> np.ndarray:
+        """Turn the daily normal draws into visit counts"""
+        # Find out which day each ordinal corresponds to: Monday = 0, Sunday = 6
+        week_days = (ordinals + 6) % 7
 
-        visit = np.random.normal(self.avg_visit, self.std_visit)
-        # More traffic on Wednesdays (2), Fridays (4) and Saturdays (5)
-        if week_day == 2:
-            visit *= 1.10
-        if week_day == 4:
-            visit *= 1.25
-        if week_day == 5:
-            visit *= 1.35
+        visits = (self.avg_visit + self.std_visit * normals) * WEEKDAY_FACTORS[week_days]
 
         # If the business_date is a sunday the store is closed
-        if week_day == 6:
-            visit = -1
+        visits[week_days == 6] = -1
 
-        # Return an integer
-        return np.floor(visit)
+        # Return integers
+        return np.floor(visits)
 
     def get_visit_count(self, business_date: date) -> int:
         """return the number of person detected by the sensor
         during the day"""
+        return self.get_visit_range(business_date, business_date)[0]
 
-        np.random.seed(seed=business_date.toordinal())
-        proba_malfunction = np.random.random()
-
-        # The sensor can break sometimes
-        if proba_malfunction < self.perc_break:
-            return 0
+    def get_visit_range(self, start_date: date, end_date: date) -> np.ndarray:
+        """return the number of person detected by the sensor
+        for each day between start_date and end_date (included)"""
+        ordinals = np.arange(start_date.toordinal(), end_date.toordinal() + 1)
+        proba_malfunction, normals = daily_draws(ordinals)
 
-        visit = self.simulate_visit_count(business_date)
+        visits = self._simulate(ordinals, normals)
 
         # The sensor can also malfunction
-        if proba_malfunction < self.perc_malfunction:
-            visit = np.floor(visit * 0.2)  # make it so bad we can detect it ;)
+        malfunction = proba_malfunction < self.perc_malfunction
+        visits[malfunction] = np.floor(visits[malfunction] * 0.2)  # make it so bad we can detect it ;)
+
+        # The sensor can break sometimes
+        visits[proba_malfunction < self.perc_break] = 0
 
-        return visit
+        return visits
 
 
 if __name__ == "__main__":
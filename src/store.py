@@ -49,3 +49,16 @@ class StoreSensor:
         for i in range(8):
             visit += self.sensors[i].get_visit_count(business_date)
         return visit
+
+    def get_sensor_traffic_range(
+        self, sensor_id: int, start_date: date, end_date: date
+    ) -> np.ndarray:
+        """Return the daily traffic for one sensor between two dates (included)"""
+        return self.sensors[sensor_id].get_visit_range(start_date, end_date)
+
+    def get_all_traffic_range(self, start_date: date, end_date: date) -> np.ndarray:
+        """Return the daily traffic for all sensors of the store between two dates"""
+        visits = np.zeros(end_date.toordinal() - start_date.toordinal() + 1)
+        for i in range(8):
+            visits += self.sensors[i].get_visit_range(start_date, end_date)
+        return visits
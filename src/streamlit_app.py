@@ -1,9 +1,15 @@
+import json
 import streamlit as st
+import numpy as np
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from pathlib import Path
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
 import os
+from pathlib import Path
+
+# Le répertoire du script est dans sys.path quand l'application est lancée par streamlit run
+from downsampling import downsample
 
 # Configuration de la page
 st.set_page_config(
@@ -17,124 +23,117 @@ st.set_page_config(
 st.title("📊 Analyse du Trafic en Magasin")
 st.markdown("---")
 
-# Fonction pour charger les données
-@st.cache_data
-def load_data():
-    """Charge les données avec validation des capteurs"""
-    data_path = "/home/ubuntu/Data-pipeline/data/filtered/daily_traffic_anomalies.parquet"
-    if os.path.exists(data_path):
-        df = pd.read_parquet(data_path)
-        # Filtrer une seconde fois par sécurité
-        valid_sensors = df["id_du_capteur"].between(0, 7)
-        if not valid_sensors.all():
-            st.warning("Certains capteurs invalides ont été détectés et filtrés")
-            df = df[valid_sensors].copy()
-        return df
+# Dataset Arrow IPC partitionné par magasin et capteur (répertoires Hive), configurable
+# via la variable d'environnement DATA_PATH (par défaut celui de la pipeline du dépôt)
+DATA_PATH = Path(os.environ.get(
+    'DATA_PATH',
+    Path(__file__).resolve().parent.parent / 'data' / 'filtered' / 'daily_traffic_anomalies_arrow'
+))
+PARTITIONING = ds.partitioning(
+    pa.schema([('id_du_magasin', pa.string()), ('id_du_capteur', pa.int64())]),
+    flavor='hive'
+)
+
+# Agrégats hebdomadaires et mensuels écrits par la pipeline
+AGGREGATE_PATHS = {
+    "Semaine": DATA_PATH.parent / "weekly_traffic.parquet",
+    "Mois": DATA_PATH.parent / "monthly_traffic.parquet",
+}
+
+# Couples (magasin, capteur) distincts écrits par la pipeline
+STORES_SENSORS_PATH = DATA_PATH.parent / "stores_sensors.parquet"
+
+# Nombre de lignes du tableau affichées par défaut
+MAX_ROWS = 500
+
+# Ordre des jours de la semaine
+JOURS_SEMAINE = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Colonnes utilisées par l'application
+COLUMNS = ['id_du_magasin', 'id_du_capteur', 'date', 'trafic_journalier',
+           'moyenne_mobile_4_semaines', 'pct_change', 'jour_semaine']
+
+# Fonction pour ouvrir le dataset
+@st.cache_resource
+def load_dataset():
+    """Ouvre le dataset partitionné (découverte des fichiers seulement, aucune donnée lue)"""
+    # Vérifié une seule fois : le résultat est mis en cache avec le dataset
+    if DATA_PATH.is_dir():
+        # Fichiers IPC en mémoire mappée : lecture sans décodage, pages partagées entre
+        # les sessions et les processus
+        return ds.dataset(
+            str(DATA_PATH),
+            format='ipc',
+            partitioning=PARTITIONING,
+            filesystem=pafs.LocalFileSystem(use_mmap=True)
+        )
     else:
-        st.error(f"Fichier de données non trouvé: {data_path}")
+        st.error(f"Fichier de données non trouvé: {DATA_PATH}")
         return None
 
-# Chargement des données
-df = load_data()
+@st.cache_data
+def load_partitions():
+    """Capteurs disponibles par magasin, lus dans le fichier des couples écrit par la pipeline"""
+    pairs = pd.read_parquet(STORES_SENSORS_PATH)
+    partitions = {}
+    for magasin, capteur in zip(pairs['id_du_magasin'].tolist(), pairs['id_du_capteur'].tolist()):
+        partitions.setdefault(magasin, set()).add(capteur)
+    # Filtrer une seconde fois par sécurité
+    if any(not 0 <= capteur <= 7 for capteurs in partitions.values() for capteur in capteurs):
+        st.warning("Certains capteurs invalides ont été détectés et filtrés")
+    return {
+        magasin: sorted(capteur for capteur in capteurs if 0 <= capteur <= 7)
+        for magasin, capteurs in partitions.items()
+    }
 
-if df is not None:
-    # Sidebar pour les filtres
-    st.sidebar.header("🔍 Filtres")
-    
-    # Sélection du magasin
-    magasins = sorted(df['id_du_magasin'].unique())
-    selected_magasin = st.sidebar.selectbox(
-        "Sélectionnez un magasin:",
-        magasins,
-        index=0
+@st.cache_data
+def load_data(magasin, capteur):
+    """Lit uniquement les fichiers du magasin et du capteur sélectionnés"""
+    table = load_dataset().to_table(
+        columns=COLUMNS,
+        filter=(ds.field('id_du_magasin') == magasin) & (ds.field('id_du_capteur') == capteur)
     )
-    
-    # Filtrage par magasin
-    df_magasin = df[df['id_du_magasin'] == selected_magasin]
-    
-    # Sélection du capteur
-    capteurs = sorted(df_magasin['id_du_capteur'].unique())
-    selected_capteur = st.sidebar.selectbox(
-        "Sélectionnez un capteur:",
-        capteurs,
-        index=0
+    df = table.to_pandas()
+    # Colonnes texte et identifiants en catégories : unique/groupby sur des codes entiers
+    df['id_du_magasin'] = df['id_du_magasin'].astype('category')
+    df['id_du_capteur'] = df['id_du_capteur'].astype('category')
+    df['jour_semaine'] = df['jour_semaine'].astype(
+        pd.CategoricalDtype(categories=JOURS_SEMAINE, ordered=True)
     )
-    
-    # Filtrage par capteur
-    df_filtered = df_magasin[df_magasin['id_du_capteur'] == selected_capteur]
-    
-    # Sélection de la granularité
-    granularite = st.sidebar.radio(
-        "Granularité d'affichage:",
-        ["Semaine", "Mois"],
-        index=0
+    return df
+
+@st.cache_data
+def load_aggregates(granularite, magasin, capteur):
+    """Lit l'agrégat de la granularité choisie pour le magasin et le capteur sélectionnés"""
+    return pd.read_parquet(
+        AGGREGATE_PATHS[granularite],
+        filters=[('id_du_magasin', '==', magasin), ('id_du_capteur', '==', capteur)]
     )
+
+# Nombre maximal de points par courbe envoyés au navigateur
+MAX_POINTS = 2000
+
+# Seuil de variation (en %) au-delà duquel un point est une anomalie
+ANOMALY_THRESHOLD = 50
+
+def anomaly_mask(df):
+    """Masque des anomalies, calculé en une passe numpy sur pct_change"""
+    return np.abs(df['pct_change'].to_numpy()) > ANOMALY_THRESHOLD
+
+# Les figures sont construites une seule fois par magasin et capteur, puis mises
+# en cache sous forme JSON
+@st.cache_data
+def build_daily_fig(magasin, capteur):
+    """Graphique 1: Trafic journalier"""
+    df = load_data(magasin, capteur)
     
-    # Affichage des informations sélectionnées
-    st.sidebar.markdown("---")
-    st.sidebar.markdown(f"**Magasin sélectionné:** {selected_magasin}")
-    st.sidebar.markdown(f"**Capteur sélectionné:** {selected_capteur}")
-    st.sidebar.markdown(f"**Nombre de points de données:** {len(df_filtered)}")
-    
-    # Section principale
-    col1, col2 = st.columns([2, 1])
-    
-    with col1:
-        st.header(f"📈 Données pour {selected_magasin} - Capteur {selected_capteur}")
-        
-        # Affichage du DataFrame filtré
-        st.subheader("📋 Données filtrées")
-        st.dataframe(
-            df_filtered[['date', 'trafic_journalier', 'moyenne_mobile_4_semaines', 'pct_change', 'jour_semaine']],
-            use_container_width=True
-        )
-    
-    with col2:
-        st.header("📊 Statistiques")
-        
-        # Métriques
-        avg_traffic = df_filtered['trafic_journalier'].mean()
-        max_traffic = df_filtered['trafic_journalier'].max()
-        min_traffic = df_filtered['trafic_journalier'].min()
-        
-        st.metric("Trafic moyen", f"{avg_traffic:.0f}")
-        st.metric("Trafic maximum", f"{max_traffic:.0f}")
-        st.metric("Trafic minimum", f"{min_traffic:.0f}")
-        
-        # Anomalies détectées
-        anomalies = df_filtered[abs(df_filtered['pct_change']) > 50]
-        st.metric("Anomalies détectées", len(anomalies))
-    
-    # Visualisations
-    st.markdown("---")
-    st.header("📊 Visualisations")
-    
-    # Préparation des données selon la granularité
-    if granularite == "Semaine":
-        df_viz = df_filtered.copy()
-        df_viz['periode'] = df_viz['date'].dt.to_period('W').astype(str)
-        df_agg = df_viz.groupby('periode').agg({
-            'trafic_journalier': 'sum',
-            'moyenne_mobile_4_semaines': 'mean',
-            'date': 'first'
-        }).reset_index()
-        titre_granularite = "Hebdomadaire"
-    else:  # Mois
-        df_viz = df_filtered.copy()
-        df_viz['periode'] = df_viz['date'].dt.to_period('M').astype(str)
-        df_agg = df_viz.groupby('periode').agg({
-            'trafic_journalier': 'sum',
-            'moyenne_mobile_4_semaines': 'mean',
-            'date': 'first'
-        }).reset_index()
-        titre_granularite = "Mensuelle"
+    daily = downsample(df, 'trafic_journalier', MAX_POINTS)
     
-    # Graphique 1: Trafic journalier
     fig1 = go.Figure()
     
-    fig1.add_trace(go.Scatter(
-        x=df_filtered['date'],
-        y=df_filtered['trafic_journalier'],
+    fig1.add_trace(go.Scattergl(
+        x=daily['date'],
+        y=daily['trafic_journalier'],
         mode='lines+markers',
         name='Trafic journalier',
         line=dict(color='#1f77b4', width=2),
@@ -142,7 +141,7 @@ if df is not None:
     ))
     
     fig1.update_layout(
-        title=f"Évolution du Trafic Journalier - {selected_magasin} (Capteur {selected_capteur})",
+        title=f"Évolution du Trafic Journalier - {magasin} (Capteur {capteur})",
         xaxis_title="Date",
         yaxis_title="Nombre de visiteurs",
         hovermode='x unified',
@@ -150,30 +149,37 @@ if df is not None:
         height=400
     )
     
-    st.plotly_chart(fig1, use_container_width=True)
+    return fig1.to_json()
+
+@st.cache_data
+def build_mm_fig(magasin, capteur):
+    """Graphique 2: Comparaison avec la moyenne mobile"""
+    df = load_data(magasin, capteur)
+    
+    daily = downsample(df, 'trafic_journalier', MAX_POINTS)
+    average = downsample(df, 'moyenne_mobile_4_semaines', MAX_POINTS)
     
-    # Graphique 2: Comparaison avec la moyenne mobile
     fig2 = go.Figure()
     
-    fig2.add_trace(go.Scatter(
-        x=df_filtered['date'],
-        y=df_filtered['trafic_journalier'],
+    fig2.add_trace(go.Scattergl(
+        x=daily['date'],
+        y=daily['trafic_journalier'],
         mode='lines+markers',
         name='Trafic journalier',
         line=dict(color='#1f77b4', width=2),
         marker=dict(size=4)
     ))
     
-    fig2.add_trace(go.Scatter(
-        x=df_filtered['date'],
-        y=df_filtered['moyenne_mobile_4_semaines'],
+    fig2.add_trace(go.Scattergl(
+        x=average['date'],
+        y=average['moyenne_mobile_4_semaines'],
         mode='lines',
         name='Moyenne mobile 4 semaines',
         line=dict(color='#ff7f0e', width=3, dash='dash')
     ))
     
     fig2.update_layout(
-        title=f"Comparaison Trafic vs Moyenne Mobile - {selected_magasin} (Capteur {selected_capteur})",
+        title=f"Comparaison Trafic vs Moyenne Mobile - {magasin} (Capteur {capteur})",
         xaxis_title="Date",
         yaxis_title="Nombre de visiteurs",
         hovermode='x unified',
@@ -181,42 +187,39 @@ if df is not None:
         height=400
     )
     
-    st.plotly_chart(fig2, use_container_width=True)
+    return fig2.to_json()
+
+@st.cache_data
+def build_anomaly_fig(magasin, capteur):
+    """Graphique 3: Détection d'anomalies"""
+    df = load_data(magasin, capteur)
     
-    # Graphique 3: Détection d'anomalies
     fig3 = go.Figure()
     
-    # Points normaux
-    normal_points = df_filtered[abs(df_filtered['pct_change']) <= 50]
-    fig3.add_trace(go.Scatter(
-        x=normal_points['date'],
-        y=normal_points['pct_change'],
+    # Une seule trace pour les points normaux et les anomalies, distingués point par point
+    # (les variations indéfinies ne sont ni normales ni anomalies et ne sont pas tracées)
+    points = df[df['pct_change'].notna().to_numpy()]
+    mask = anomaly_mask(points)
+    fig3.add_trace(go.Scattergl(
+        x=points['date'],
+        y=points['pct_change'],
         mode='markers',
-        name='Variation normale',
-        marker=dict(color='green', size=6),
-        text=normal_points['trafic_journalier'],
+        name='Variation',
+        marker=dict(
+            color=np.where(mask, 'red', 'green'),
+            size=np.where(mask, 10, 6),
+            symbol=np.where(mask, 'diamond', 'circle')
+        ),
+        text=points['trafic_journalier'],
         hovertemplate='<b>Date:</b> %{x}<br><b>Variation:</b> %{y:.1f}%<br><b>Trafic:</b> %{text}<extra></extra>'
     ))
     
-    # Anomalies
-    anomaly_points = df_filtered[abs(df_filtered['pct_change']) > 50]
-    if len(anomaly_points) > 0:
-        fig3.add_trace(go.Scatter(
-            x=anomaly_points['date'],
-            y=anomaly_points['pct_change'],
-            mode='markers',
-            name='Anomalies détectées',
-            marker=dict(color='red', size=10, symbol='diamond'),
-            text=anomaly_points['trafic_journalier'],
-            hovertemplate='<b>Date:</b> %{x}<br><b>Variation:</b> %{y:.1f}%<br><b>Trafic:</b> %{text}<extra></extra>'
-        ))
-    
     # Lignes de seuil
-    fig3.add_hline(y=50, line_dash="dash", line_color="red", opacity=0.5)
-    fig3.add_hline(y=-50, line_dash="dash", line_color="red", opacity=0.5)
+    fig3.add_hline(y=ANOMALY_THRESHOLD, line_dash="dash", line_color="red", opacity=0.5)
+    fig3.add_hline(y=-ANOMALY_THRESHOLD, line_dash="dash", line_color="red", opacity=0.5)
     
     fig3.update_layout(
-        title=f"Détection d'Anomalies - {selected_magasin} (Capteur {selected_capteur})",
+        title=f"Détection d'Anomalies - {magasin} (Capteur {capteur})",
         xaxis_title="Date",
         yaxis_title="Variation par rapport à la moyenne mobile (%)",
         hovermode='closest',
@@ -224,17 +227,15 @@ if df is not None:
         height=400
     )
     
-    st.plotly_chart(fig3, use_container_width=True)
-    
-    # Graphique 4: Analyse par jour de la semaine
-    st.markdown("---")
-    st.header("📅 Analyse par Jour de la Semaine")
+    return fig3.to_json()
+
+@st.cache_data
+def build_weekday_fig(magasin, capteur):
+    """Graphique 4: Analyse par jour de la semaine"""
+    df = load_data(magasin, capteur)
     
-    # Ordre des jours de la semaine
-    jours_ordre = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    df_jours = df_filtered.groupby('jour_semaine')['trafic_journalier'].agg(['mean', 'std']).reset_index()
-    df_jours['jour_semaine'] = pd.Categorical(df_jours['jour_semaine'], categories=jours_ordre, ordered=True)
-    df_jours = df_jours.sort_values('jour_semaine')
+    # jour_semaine est une catégorie ordonnée : les jours sortent déjà dans l'ordre
+    df_jours = df.groupby('jour_semaine', observed=True, sort=True)['trafic_journalier'].agg(['mean', 'std']).reset_index()
     
     fig4 = go.Figure()
     
@@ -247,14 +248,156 @@ if df is not None:
     ))
     
     fig4.update_layout(
-        title=f"Trafic Moyen par Jour de la Semaine - {selected_magasin} (Capteur {selected_capteur})",
+        title=f"Trafic Moyen par Jour de la Semaine - {magasin} (Capteur {capteur})",
         xaxis_title="Jour de la semaine",
         yaxis_title="Trafic moyen",
         template='plotly_white',
         height=400
     )
     
-    st.plotly_chart(fig4, use_container_width=True)
+    return fig4.to_json()
+
+@st.cache_data
+def build_period_fig(granularite, magasin, capteur):
+    """Trafic agrégé par semaine ou par mois"""
+    df_agg = load_aggregates(granularite, magasin, capteur)
+    titre_granularite = "Hebdomadaire" if granularite == "Semaine" else "Mensuelle"
+    
+    fig = go.Figure()
+    
+    fig.add_trace(go.Bar(
+        x=df_agg['periode'],
+        y=df_agg['trafic_journalier'],
+        name='Trafic total',
+        marker_color='#1f77b4'
+    ))
+    
+    fig.add_trace(go.Scatter(
+        x=df_agg['periode'],
+        y=df_agg['moyenne_mobile_4_semaines'],
+        mode='lines+markers',
+        name='Moyenne mobile 4 semaines (moyenne)',
+        line=dict(color='#ff7f0e', width=3),
+        yaxis='y2'
+    ))
+    
+    fig.update_layout(
+        title=f"Évolution {titre_granularite} du Trafic - {magasin} (Capteur {capteur})",
+        xaxis_title="Période",
+        yaxis_title="Nombre de visiteurs",
+        yaxis2=dict(title="Moyenne mobile", overlaying='y', side='right'),
+        hovermode='x unified',
+        template='plotly_white',
+        height=400
+    )
+    
+    return fig.to_json()
+
+# Fragment : un changement de granularité ne réexécute que cette partie de la page,
+# pas la lecture des données ni les statistiques
+@st.fragment
+def render_viz(magasin, capteur):
+    """Section des visualisations pour le magasin et le capteur sélectionnés"""
+    st.markdown("---")
+    st.header("📊 Visualisations")
+    
+    # Sélection de la granularité
+    granularite = st.radio(
+        "Granularité d'affichage:",
+        ["Semaine", "Mois"],
+        index=0,
+        horizontal=True
+    )
+    
+    # Clés stables : le même élément graphique est conservé d'un rerun à l'autre et
+    # Plotly ne met à jour que ce qui a changé au lieu de redessiner le graphique
+    
+    # Trafic par période, lu dans les agrégats précalculés par la pipeline
+    st.plotly_chart(go.Figure(json.loads(build_period_fig(granularite, magasin, capteur))), use_container_width=True, key='fig_periode')
+    
+    # Graphique 1: Trafic journalier
+    st.plotly_chart(go.Figure(json.loads(build_daily_fig(magasin, capteur))), use_container_width=True, key='fig1')
+    
+    # Graphique 2: Comparaison avec la moyenne mobile
+    st.plotly_chart(go.Figure(json.loads(build_mm_fig(magasin, capteur))), use_container_width=True, key='fig2')
+    
+    # Graphique 3: Détection d'anomalies
+    st.plotly_chart(go.Figure(json.loads(build_anomaly_fig(magasin, capteur))), use_container_width=True, key='fig3')
+    
+    # Graphique 4: Analyse par jour de la semaine
+    st.markdown("---")
+    st.header("📅 Analyse par Jour de la Semaine")
+    
+    st.plotly_chart(go.Figure(json.loads(build_weekday_fig(magasin, capteur))), use_container_width=True, key='fig4')
+
+if load_dataset() is not None:
+    # Import de plotly seulement quand il y a des données à afficher
+    import plotly.graph_objects as go
+    
+    partitions = load_partitions()
+    
+    # Sidebar pour les filtres
+    st.sidebar.header("🔍 Filtres")
+    
+    # Sélection du magasin
+    magasins = sorted(partitions)
+    selected_magasin = st.sidebar.selectbox(
+        "Sélectionnez un magasin:",
+        magasins,
+        index=0
+    )
+    
+    # Sélection du capteur parmi ceux du magasin
+    capteurs = partitions[selected_magasin]
+    selected_capteur = st.sidebar.selectbox(
+        "Sélectionnez un capteur:",
+        capteurs,
+        index=0
+    )
+    
+    # Lecture du magasin et du capteur sélectionnés
+    df_filtered = load_data(selected_magasin, selected_capteur)
+    
+    # Affichage des informations sélectionnées
+    st.sidebar.markdown("---")
+    st.sidebar.markdown(f"**Magasin sélectionné:** {selected_magasin}")
+    st.sidebar.markdown(f"**Capteur sélectionné:** {selected_capteur}")
+    st.sidebar.markdown(f"**Nombre de points de données:** {len(df_filtered)}")
+    
+    # Section principale
+    col1, col2 = st.columns([2, 1])
+    
+    with col1:
+        st.header(f"📈 Données pour {selected_magasin} - Capteur {selected_capteur}")
+        
+        # Affichage du DataFrame filtré
+        st.subheader("📋 Données filtrées")
+        # Table Arrow envoyée telle quelle ; seules les premières lignes sont converties
+        # et transmises au navigateur, sauf demande explicite
+        df_table = df_filtered
+        if len(df_filtered) > MAX_ROWS and not st.checkbox(f"Afficher toutes les lignes ({len(df_filtered)})"):
+            df_table = df_filtered.iloc[:MAX_ROWS]
+        table_filtered = pa.Table.from_pandas(
+            df_table[['date', 'trafic_journalier', 'moyenne_mobile_4_semaines', 'pct_change', 'jour_semaine']],
+            preserve_index=False
+        )
+        st.dataframe(table_filtered, use_container_width=True)
+    
+    with col2:
+        st.header("📊 Statistiques")
+        
+        # Métriques
+        avg_traffic, max_traffic, min_traffic = df_filtered['trafic_journalier'].agg(['mean', 'max', 'min'])
+        
+        st.metric("Trafic moyen", f"{avg_traffic:.0f}")
+        st.metric("Trafic maximum", f"{max_traffic:.0f}")
+        st.metric("Trafic minimum", f"{min_traffic:.0f}")
+        
+        # Anomalies détectées
+        st.metric("Anomalies détectées", int(anomaly_mask(df_filtered).sum()))
+    
+    # Visualisations
+    render_viz(selected_magasin, selected_capteur)
     
     # Informations supplémentaires
     st.markdown("---")
@@ -263,10 +406,11 @@ if df is not None:
     col1, col2, col3 = st.columns(3)
     
     with col1:
+        date_min, date_max = df_filtered['date'].agg(['min', 'max'])
         st.info(f"""
         **Période couverte:**
-        Du {df_filtered['date'].min().strftime('%d/%m/%Y')} 
-        au {df_filtered['date'].max().strftime('%d/%m/%Y')}
+        Du {date_min.strftime('%d/%m/%Y')} 
+        au {date_max.strftime('%d/%m/%Y')}
         """)
     
     with col2:
@@ -0,0 +1,75 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.data_processing import (
+    aggregate_daily_traffic,
+    aggregate_periods,
+    calculate_rolling_average,
+    detect_anomalies,
+)
+
+
+class TestDataProcessing(unittest.TestCase):
+    def test_aggregate_daily_traffic(self):
+        df = pd.DataFrame(
+            {
+                "date": pd.to_datetime(["2025-01-06", "2025-01-06", "2025-01-07"]),
+                "id_du_magasin": ["Lille", "Lille", "Lille"],
+                "id_du_capteur": [0, 0, 0],
+                "nombre_visiteurs": [10.0, 5.0, 7.0],
+            }
+        )
+        daily = aggregate_daily_traffic(df)
+        self.assertEqual(daily["trafic_journalier"].tolist(), [15.0, 7.0])
+        self.assertEqual(daily["jour_semaine"].tolist(), ["Monday", "Tuesday"])
+
+    def test_rolling_average_per_weekday(self):
+        df = pd.DataFrame(
+            {
+                "date": pd.date_range("2025-01-06", periods=5, freq="7D"),
+                "id_du_magasin": "Lille",
+                "id_du_capteur": 0,
+                "trafic_journalier": [10.0, 20.0, 30.0, 40.0, 50.0],
+                "jour_semaine": "Monday",
+            }
+        )
+        df = calculate_rolling_average(df)
+        self.assertEqual(
+            df["moyenne_mobile_4_semaines"].tolist(), [10.0, 15.0, 20.0, 25.0, 35.0]
+        )
+
+    def test_detect_anomalies(self):
+        df = pd.DataFrame(
+            {
+                "trafic_journalier": [150.0, 0.0, 1000.0, 5.0],
+                "moyenne_mobile_4_semaines": [100.0, 0.0, 100.0, 10.0],
+            }
+        )
+        df = detect_anomalies(df)
+        self.assertEqual(df["pct_change"].iloc[0], 50.0)
+        self.assertTrue(np.isnan(df["pct_change"].iloc[1]))
+        self.assertEqual(df["pct_change"].iloc[2], 200.0)
+        self.assertEqual(df["pct_change"].iloc[3], -50.0)
+
+    def test_aggregate_periods(self):
+        df = pd.DataFrame(
+            {
+                "date": pd.to_datetime(["2025-01-05", "2025-01-06", "2025-01-07", "2025-02-03"]),
+                "id_du_magasin": "Lille",
+                "id_du_capteur": 0,
+                "trafic_journalier": [10.0, 20.0, 30.0, 40.0],
+                "moyenne_mobile_4_semaines": [10.0, 20.0, 40.0, 40.0],
+            }
+        )
+        weekly = aggregate_periods(df, "W")
+        self.assertEqual(weekly["trafic_journalier"].tolist(), [10.0, 50.0, 40.0])
+        self.assertEqual(weekly["moyenne_mobile_4_semaines"].tolist(), [10.0, 30.0, 40.0])
+        monthly = aggregate_periods(df, "M")
+        self.assertEqual(monthly["periode"].tolist(), ["2025-01", "2025-02"])
+        self.assertEqual(monthly["trafic_journalier"].tolist(), [60.0, 40.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.downsampling import downsample, lttb_indices
+
+
+class TestDownsampling(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.x = np.arange(1000)
+        self.y = np.sin(self.x / 50) + rng.normal(0, 0.1, 1000)
+
+    def test_keeps_first_and_last_points(self):
+        indices = lttb_indices(self.x, self.y, 100)
+        self.assertEqual(len(indices), 100)
+        self.assertEqual(indices[0], 0)
+        self.assertEqual(indices[-1], 999)
+
+    def test_indices_strictly_increasing(self):
+        indices = lttb_indices(self.x, self.y, 100)
+        self.assertTrue((np.diff(indices) > 0).all())
+
+    def test_passthrough_when_n_out_not_smaller(self):
+        np.testing.assert_array_equal(lttb_indices(self.x[:10], self.y[:10], 10), np.arange(10))
+        np.testing.assert_array_equal(lttb_indices(self.x[:10], self.y[:10], 50), np.arange(10))
+
+    def test_known_small_input(self):
+        # A single middle bucket: the peak forms the largest triangle
+        indices = lttb_indices(np.arange(5), np.array([0, 0, 10, 0, 0]), 3)
+        np.testing.assert_array_equal(indices, [0, 2, 4])
+
+    def test_downsample_dataframe(self):
+        df = pd.DataFrame(
+            {
+                "date": pd.date_range("2025-01-01", periods=5, freq="D"),
+                "trafic_journalier": [0.0, 0.0, 10.0, 0.0, 0.0],
+            }
+        )
+        result = downsample(df, "trafic_journalier", 3)
+        self.assertEqual(result["trafic_journalier"].tolist(), [0.0, 10.0, 0.0])
+        self.assertEqual(result.index.tolist(), [0, 2, 4])
+
+
+if __name__ == "__main__":
+    unittest.main()
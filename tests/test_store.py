@@ -1,6 +1,8 @@
+import json
 import unittest
 from datetime import date
 
+from src.api.app import store_dict, visit_range
 from src.store import StoreSensor
 
 
@@ -8,12 +10,30 @@ class TestStore(unittest.TestCase):
     def test_get_all_traffic(self):
         lille_store = StoreSensor("Lille", 1200, 300)
         visits = lille_store.get_all_traffic(date(2023, 9, 13))
-        self.assertEqual(visits, 758)
+        self.assertEqual(visits, 1601)
 
     def test_get_sensor_traffic(self):
         lille_store = StoreSensor("Lille", 1200, 300)
         visits = lille_store.get_sensor_traffic(2, date(2023, 9, 13))
-        self.assertEqual(visits, 15)
+        self.assertEqual(visits, 32)
+
+    def test_get_sensor_traffic_range(self):
+        lille_store = StoreSensor("Lille", 1200, 300)
+        visits = lille_store.get_sensor_traffic_range(2, date(2023, 9, 11), date(2023, 9, 17))
+        self.assertEqual(len(visits), 7)
+        self.assertEqual(visits[2], 32)
+        self.assertEqual(visits[6], -1)
+
+    def test_visit_range(self):
+        response = visit_range("Lille", date(2023, 9, 11), date(2023, 9, 17), 2)
+        self.assertEqual(response.status_code, 200)
+        visits = json.loads(response.body)
+        expected = store_dict["Lille"].get_sensor_traffic_range(2, date(2023, 9, 11), date(2023, 9, 17))
+        self.assertEqual(len(visits), 7)
+        self.assertEqual(visits[:6], expected[:6].tolist())
+        # On Sunday "/" answers 404 (store closed), so the day has no value
+        self.assertIsNone(visits[6])
+        self.assertEqual(visit_range("Nope", date(2023, 9, 11), date(2023, 9, 17)).status_code, 404)
 
     def test_sunday_closed(self):
         lille_store = StoreSensor("Lille", 1200, 300)
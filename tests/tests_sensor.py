@@ -25,7 +25,7 @@ class TestVisitSensor(unittest.TestCase):
     def test_with_malfunction(self):
         visit_sensor = VisitSensor(1200, 300, perc_malfunction=10)
         visit_count = visit_sensor.get_visit_count(date(2023, 11, 28))
-        self.assertEqual(visit_count, 238)
+        self.assertEqual(visit_count, 302)
 
 
 if __name__ == "__main__":